@@ -0,0 +1,79 @@
+"""
+Memory benchmark: bytes per shot for per-object batch runs versus array-backed tables.
+
+Run from the Workspace directory:
+    python benchmarks/memory_benchmark.py [shots]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from armour_class import Armour
+from batch_class import BatchSimulation, armour_table, bullet_table, medium_table
+from bullet_class import Bullet
+from medium_class import Medium
+from simulation_class import Simulation
+from weapon_class import Weapon
+
+
+def measure(build):
+    """
+    Returns the bytes still allocated after build() ran, and its result.
+    """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = build()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return after - before, result
+
+
+def per_object(shots):
+    """
+    One Bullet, Medium, Armour and Simulation per shot, with result dicts as returned by Simulation.
+    """
+    weapon = Weapon("glock_17")
+    result = {
+        "initial_energy": 0.0,
+        "final_velocity": 0.0,
+        "time_elapsed": 0.0,
+        "final_position": 0.0,
+        "final_vertical_position": 0.0,
+        "final_vertical_velocity": 0.0,
+        "final_kinetic_energy": 0.0,
+        "vertical_drop": 0.0,
+        "energy_loss": 0.0,
+    }
+    runs = []
+    for shot in range(shots):
+        sim = Simulation(weapon, Bullet("9mm"))
+        sim.air_result = {key: float(shot) for key in result}
+        runs.append((sim, Medium("unc_air"), Armour("class_2"), Medium("unc_tissue")))
+    return runs
+
+
+def array_backed(shots, precision):
+    """
+    Structured parameter tables plus one struct-of-arrays state.
+    """
+    batch = BatchSimulation(bullet_table(Bullet("9mm"), shots, precision), precision)
+    tables = (
+        medium_table(Medium("unc_air"), shots, precision),
+        armour_table(Armour("class_2"), shots, precision),
+        medium_table(Medium("unc_tissue"), shots, precision),
+    )
+    return batch, tables, batch.initial_state()
+
+
+if __name__ == "__main__":
+    shots = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    rows = [("objects + dicts", measure(lambda: per_object(shots))[0])]
+    for precision in ("float64", "float32"):
+        rows.append((f"arrays ({precision})", measure(lambda: array_backed(shots, precision))[0]))
+
+    print(f"{'layout':<20}{'bytes/shot':>12}")
+    for name, size in rows:
+        print(f"{name:<20}{size / shots:>12.1f}")
@@ -14,7 +14,8 @@ class Armour:
         self.material = self.data['material']
         self.thickness = self.data['thickness_meters']
         self.energy_absorption = self.data['energy_absorption_joules_per_m2']
-        self.density = self.data.get('density_g_per_cm3', None)
+        material_density = self.material.get('density_g_per_cm3') if isinstance(self.material, dict) else None
+        self.density = self.data.get('density_g_per_cm3', material_density)
         self.test_standard = self.data['test_standard']
 
     def _load_data(self):
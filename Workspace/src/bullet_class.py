@@ -24,6 +24,10 @@ class Bullet:
         self.shape = self.data['bullet']['shape']
         self.jacket_material = self.data['bullet']['jacket']['material']
 
+        fragmentation = self.data['bullet'].get('fragmentation', {})
+        self.fragmentation_stress = fragmentation.get('threshold_stress', {}).get('value')  # MPa
+        self.fragment_count = fragmentation.get('fragment_count')
+
     def _load_data(self):
         """
         Loads the bullet data from a JSON file or dictionary.
@@ -0,0 +1,225 @@
+import math
+
+import numpy as np
+
+from armour_class import Armour
+from batch_class import STATE_FIELDS, BatchSimulation, armour_table, bullet_table_from_arrays, medium_table
+
+
+class Fragmentation:
+    """
+    Splits projectiles into fragments once the impact stress on a layer exceeds the
+    bullet's material limit, and propagates all fragments as one struct-of-arrays batch.
+    """
+
+    def __init__(self, bullet, threshold_stress=None, fragment_count=None, velocity_spread=0.1,
+                 mass_concentration=2.0, stop_velocity=10.0, seed=None):
+        """
+        :param bullet: Bullet that fragments.
+        :param threshold_stress: Impact stress (MPa) above which the bullet fragments.
+                                 Defaults to the bullet's fragmentation data.
+        :param fragment_count: Number of fragments per fragmenting shot.
+        :param velocity_spread: Relative standard deviation of fragment velocities.
+        :param mass_concentration: Dirichlet concentration of the mass split; larger values
+                                   give more even fragments.
+        :param stop_velocity: Velocity (m/s) below which a projectile is counted as stopped
+                              in a medium; small fragments otherwise crawl on for seconds.
+        :param seed: Seed for the random fragment distributions.
+        """
+        self.bullet = bullet
+        self.threshold_stress = threshold_stress if threshold_stress is not None else bullet.fragmentation_stress
+        self.fragment_count = fragment_count if fragment_count is not None else bullet.fragment_count
+        if self.threshold_stress is None or self.fragment_count is None:
+            raise ValueError(f"No fragmentation data for bullet '{bullet.bullet_type}'.")
+        self.velocity_spread = velocity_spread
+        self.mass_concentration = mass_concentration
+        self.stop_velocity = stop_velocity
+        self.rng = np.random.default_rng(seed)
+
+    def impact_stress(self, layer, velocity):
+        """
+        Stress on the intact bullet when it strikes a layer.
+        For a Medium this is the stagnation pressure 0.5 * rho * Cd * v^2; for an Armour it is
+        the dynamic pressure 0.5 * rho * v^2 of the plate material. Both grow with the impact
+        velocity, so the threshold separates slow shots from fast ones.
+        :param layer: Medium or Armour being entered.
+        :param velocity: Impact velocity per shot (m/s).
+        :return: Stress in MPa, per shot.
+        """
+        velocity = np.asarray(velocity, dtype=float)
+        if isinstance(layer, Armour):
+            if layer.density is None:
+                raise ValueError(f"No density data for armour '{layer.armour_type}'.")
+            return 0.5 * (layer.density * 1000) * velocity ** 2 / 1e6  # g/cm^3 -> kg/m^3
+        return 0.5 * layer.density * layer.drag_coefficient * velocity ** 2 / 1e6
+
+    def split(self, velocity, fragmented):
+        """
+        Builds the fragment population for a set of intact projectiles.
+        Fragmenting projectiles are split into fragment_count pieces that conserve mass and
+        kinetic energy; the others stay a single intact projectile. Fragment velocities
+        scatter around the parent velocity, so their momentum is at most the parent's.
+        :param velocity: Velocity per intact projectile (m/s).
+        :param fragmented: Boolean array, True where the projectile fragments.
+        :return: Tuple (row, mass, caliber, velocity) of per-projectile arrays; row is the
+                 index of the input projectile each output comes from.
+        """
+        velocity = np.asarray(velocity, dtype=float)
+        counts = np.where(fragmented, self.fragment_count, 1)
+        row = np.repeat(np.arange(len(velocity)), counts)
+        is_fragment = np.asarray(fragmented)[row]
+
+        parent_mass = self.bullet.mass
+        mass = np.full(len(row), parent_mass, dtype=float)
+        caliber = np.full(len(row), self.bullet.caliber, dtype=float)
+
+        # Mass split: Dirichlet fractions of the parent mass, one row per fragmenting projectile.
+        shares = self.rng.gamma(self.mass_concentration, size=(int(np.count_nonzero(fragmented)), self.fragment_count))
+        shares /= shares.sum(axis=1, keepdims=True)
+        mass[is_fragment] = (shares * parent_mass).ravel()
+
+        # Fragments are treated as spheres of core material.
+        density = self.bullet.core_density * 1000  # kg/m^3
+        radius = np.cbrt(3 * (mass[is_fragment] / 1000) / (4 * math.pi * density))
+        caliber[is_fragment] = 2 * radius * 1000
+
+        # Velocities scatter around the parent velocity, rescaled so the fragments carry
+        # exactly the parent's kinetic energy; breaking up must not create energy.
+        fragment_velocity = velocity[row] * (1 + self.velocity_spread * self.rng.standard_normal(len(row)) * is_fragment)
+        fragment_velocity = np.maximum(fragment_velocity, 0)
+        energy = np.bincount(row, weights=mass * fragment_velocity ** 2, minlength=len(velocity))
+        scale = np.sqrt(np.divide(parent_mass * velocity ** 2, energy, out=np.ones_like(velocity), where=energy > 0))
+        fragment_velocity *= scale[row]
+
+        return row, mass, caliber, fragment_velocity
+
+    def simulate(self, layers, velocity, position=0, vertical_velocity=0, vertical_position=0, time=0,
+                 precision="float64"):
+        """
+        Propagates every projectile through all layers as one batch.
+        Intact projectiles whose impact stress exceeds the threshold are split: on entry to a
+        Medium, or on exit from an Armour, which is applied once to the intact projectile so
+        the fragments share the energy left after penetration.
+        :param layers: List of (medium, distance_meters) pairs; an Armour layer ignores its distance.
+        :param velocity: Entry velocity per parent shot (scalar or array).
+        :param position, vertical_velocity, vertical_position, time: Entry state, scalar or per shot.
+        :param precision: "float64" or "float32".
+        :return: Dictionary of per-projectile arrays ("shot" maps each to its parent; "stopped"
+                 marks projectiles that came to rest, with velocity and energy 0), and per
+                 shot "fragmented", "initial_energy" and "energy_loss".
+        """
+        velocity = np.atleast_1d(np.asarray(velocity, dtype=float))
+        count = len(velocity)
+        projectiles = {
+            "shot": np.arange(count),
+            "mass": np.full(count, self.bullet.mass, dtype=float),
+            "caliber": np.full(count, self.bullet.caliber, dtype=float),
+            "is_fragment": np.zeros(count, dtype=bool),
+            "stopped": np.zeros(count, dtype=bool),
+            "velocity": velocity.copy(),
+            "position": np.broadcast_to(position, velocity.shape).astype(float),
+            "vertical_velocity": np.broadcast_to(vertical_velocity, velocity.shape).astype(float),
+            "vertical_position": np.broadcast_to(vertical_position, velocity.shape).astype(float),
+            "time": np.broadcast_to(time, velocity.shape).astype(float),
+        }
+        initial_energy = 0.5 * (self.bullet.mass / 1000.0) * velocity ** 2
+        stress = np.zeros((count, len(layers)))
+
+        for index, (medium, distance_meters) in enumerate(layers):
+            intact = np.flatnonzero(~projectiles["is_fragment"] & (projectiles["velocity"] > self.stop_velocity))
+            layer_stress = self.impact_stress(medium, projectiles["velocity"][intact])
+            stress[projectiles["shot"][intact], index] = layer_stress
+            splitting = np.zeros(len(projectiles["shot"]), dtype=bool)
+            splitting[intact] = layer_stress > self.threshold_stress
+
+            if isinstance(medium, Armour):
+                self._propagate(projectiles, medium, distance_meters, precision)
+                projectiles = self._split_rows(projectiles, splitting & (projectiles["velocity"] > 0))
+            else:
+                projectiles = self._split_rows(projectiles, splitting)
+                self._propagate(projectiles, medium, distance_meters, precision)
+
+        final_energy = 0.5 * (projectiles["mass"] / 1000.0) * projectiles["velocity"] ** 2
+        shot = projectiles["shot"]
+        fragmented_shots = np.bincount(shot, weights=projectiles["is_fragment"], minlength=count) > 0
+        return {
+            "fragmented": fragmented_shots,
+            "impact_stress": stress,
+            "shot": shot,
+            "mass": projectiles["mass"],
+            "caliber": projectiles["caliber"],
+            "stopped": projectiles["stopped"],
+            "initial_energy": initial_energy,
+            "final_velocity": projectiles["velocity"],
+            "final_position": projectiles["position"],
+            "final_vertical_position": projectiles["vertical_position"],
+            "time_elapsed": projectiles["time"],
+            "final_kinetic_energy": final_energy,
+            "energy_loss": initial_energy - np.bincount(shot, weights=final_energy, minlength=count),
+        }
+
+    def _split_rows(self, projectiles, splitting):
+        """
+        Replaces every splitting projectile by its fragments, keeping the others as they are.
+        """
+        if not splitting.any():
+            return projectiles
+        split_rows = np.flatnonzero(splitting)
+        row, mass, caliber, velocity = self.split(projectiles["velocity"][split_rows], np.ones(len(split_rows), dtype=bool))
+        keep = np.flatnonzero(~splitting)
+        result = {name: values[np.concatenate([keep, split_rows[row]])] for name, values in projectiles.items()}
+        result["mass"][len(keep):] = mass
+        result["caliber"][len(keep):] = caliber
+        result["velocity"][len(keep):] = velocity
+        result["is_fragment"][len(keep):] = True
+        return result
+
+    def _propagate(self, projectiles, medium, distance_meters, precision):
+        """
+        Moves all projectiles through one layer, updating the arrays in place. Projectiles
+        that end at or below stop_velocity are marked stopped and set to rest.
+        """
+        batch = BatchSimulation(bullet_table_from_arrays(projectiles["mass"], projectiles["caliber"],
+                                                         projectiles["velocity"], precision), precision)
+        state = batch.initial_state()
+        for name in STATE_FIELDS:
+            getattr(state, name)[:] = projectiles[name]
+        if isinstance(medium, Armour):
+            batch.armour(armour_table(medium, precision=precision), state)
+        else:
+            batch.simulate(medium_table(medium, precision=precision), distance_meters, state,
+                           stop_velocity=self.stop_velocity)
+        for name in STATE_FIELDS:
+            projectiles[name][:] = getattr(state, name)
+
+        resting = projectiles["velocity"] <= self.stop_velocity
+        projectiles["velocity"][resting] = 0
+        projectiles["stopped"] |= resting
+
+    def simulate_after_armour(self, simulation, armour, layers, precision="float64"):
+        """
+        Continues a Simulation from its air stage through the armour and the remaining
+        layers with fragmentation. The plate is applied by simulate(), which matches
+        armour_simulation() for the intact bullet and splits it after penetration.
+        :param simulation: Simulation on which armour_simulation() has been run.
+        :param armour: The Armour passed to armour_simulation().
+        :param layers: Remaining (medium, distance_meters) layers, e.g. [(tissue, 0.4)].
+        """
+        if simulation.armour_result is None:
+            raise ValueError("Run armour_simulation() first to get initial conditions.")
+
+        if not simulation.armour_result["penetration"]:
+            return {
+                "message": "Mermi zırhı delmedi."
+            }
+
+        air_result = simulation.air_result
+        return self.simulate(
+            [(armour, 0)] + list(layers),
+            velocity=air_result["final_velocity"],
+            position=air_result["final_position"],
+            vertical_velocity=air_result["final_vertical_velocity"],
+            vertical_position=air_result["final_vertical_position"],
+            time=air_result["time_elapsed"],
+            precision=precision,
+        )
@@ -3,17 +3,37 @@ import math
 import os
 
 
+STAGES = ["air", "armour", "tissue"]
+
+
 class Simulation:
-    def __init__(self, weapon, bullet):
+    def __init__(self, weapon, bullet, checkpoint_interval=1.0):
+        """
+        :param weapon: Weapon firing the bullet.
+        :param bullet: Bullet being simulated.
+        :param checkpoint_interval: Spacing of the range gates (meters) at which trajectory
+                                    states are stored for resuming. None disables checkpoints.
+        """
         self.weapon = weapon
         self.bullet = bullet
+        self.checkpoint_interval = checkpoint_interval
         self.air_result = None
         self.armour_result = None
         self.tissue_result = None
 
-    def simulate(self, medium, distance_meters, initial_velocity=None, initial_position=0, initial_vertical_velocity=0, initial_vertical_position=0, initial_time=0):
+        # Per stage: the key its inputs were computed with, its checkpoints and cached result.
+        self._stage_keys = {}
+        self._checkpoints = {}
+        self._cache = {}
+
+    def simulate(self, medium, distance_meters, initial_velocity=None, initial_position=0, initial_vertical_velocity=0, initial_vertical_position=0, initial_time=0, checkpoints=None, resume_from=None):
         """
         Verilen koşullar altında merminin hareketini simüle eder.
+        :param checkpoints: Optional dict (position -> state) filled with the state at every
+                            range gate and at the end of the run.
+        :param resume_from: Optional state (velocity, position, vertical_velocity,
+                            vertical_position, time) from an earlier run with the same initial
+                            conditions; integration continues from it.
         """
         velocity = initial_velocity if initial_velocity is not None else self.weapon.muzzle_velocity
         position = initial_position
@@ -31,6 +51,16 @@ class Simulation:
         initial_kinetic_energy = self.bullet.kinetic_energy(velocity)
         target_position = position + distance_meters
 
+        if resume_from is not None:
+            velocity, position, vertical_velocity, vertical_position, time = resume_from
+            if velocity <= 0:
+                target_position = position
+
+        interval = self.checkpoint_interval
+        next_gate = float("inf")
+        if checkpoints is not None and interval:
+            next_gate = initial_position + interval * (math.floor((position - initial_position) / interval) + 1)
+
         while position < target_position:
             drag_force = 0.5 * density * drag_coefficient * cross_sectional_area * velocity ** 2
 
@@ -44,9 +74,16 @@ class Simulation:
 
             time += time_step
 
+            if position >= next_gate:
+                checkpoints[position] = (velocity, position, vertical_velocity, vertical_position, time)
+                next_gate += interval
+
             if velocity <= 0:
                 break
 
+        if checkpoints is not None:
+            checkpoints[position] = (velocity, position, vertical_velocity, vertical_position, time)
+
         final_kinetic_energy = self.bullet.kinetic_energy(velocity)
         energy_loss = initial_kinetic_energy - final_kinetic_energy
 
@@ -65,16 +102,24 @@ class Simulation:
     def air_simulation(self, medium, distance_meters):
         """
         Havada simülasyon. İlk ortam.
+        Resumes from the nearest stored checkpoint when only the distance changed.
         """
-        result = self.simulate(
-            medium=medium,
-            distance_meters=distance_meters,
-            initial_velocity=self.weapon.muzzle_velocity,
-            initial_position=0,
-            initial_vertical_velocity=0,
-            initial_vertical_position=0,
-            initial_time=0
-        )
+        key = self._stage_key(self.weapon.muzzle_velocity, self.bullet.to_dict(), medium.to_dict())
+        result = self._begin_stage("air", key, distance_meters)
+        if result is None:
+            checkpoints = self._checkpoints["air"]
+            result = self.simulate(
+                medium=medium,
+                distance_meters=distance_meters,
+                initial_velocity=self.weapon.muzzle_velocity,
+                initial_position=0,
+                initial_vertical_velocity=0,
+                initial_vertical_position=0,
+                initial_time=0,
+                checkpoints=checkpoints,
+                resume_from=self._resume_point(checkpoints, distance_meters)
+            )
+            self._cache["air"] = ((key, distance_meters), dict(result))
         self.air_result = result
         return result
 
@@ -88,6 +133,12 @@ class Simulation:
         if self.air_result is None:
             raise ValueError("Run air_simulation() first to get initial conditions.")
 
+        key = self._stage_key(self._upstream_key("air"), medium.to_dict())
+        cached = self._begin_stage("armour", key, None)
+        if cached is not None:
+            self.armour_result = cached
+            return cached
+
         # Initial parameters
         initial_velocity = self.air_result["final_velocity"]
         cross_sectional_area = self.bullet.cross_sectional_area()
@@ -122,6 +173,7 @@ class Simulation:
             "remaining_energy": remaining_energy,
             "deformation": deformation,
         }
+        self._cache["armour"] = ((key, None), dict(self.armour_result))
 
         return self.armour_result
 
@@ -138,14 +190,81 @@ class Simulation:
                 "message": "Mermi zırhı delmedi."
             }
 
-        result = self.simulate(
-            medium=medium,
-            distance_meters=distance_meters,
-            initial_velocity=math.sqrt(2 * self.armour_result["remaining_energy"] / (self.bullet.mass / 1000.0)),
-            initial_position=self.air_result["final_position"],
-            initial_vertical_velocity=self.air_result["final_vertical_velocity"],
-            initial_vertical_position=self.air_result["final_vertical_position"],
-            initial_time=self.air_result["time_elapsed"]
-        )
+        key = self._stage_key(self._upstream_key("armour"), medium.to_dict())
+        result = self._begin_stage("tissue", key, distance_meters)
+        if result is None:
+            checkpoints = self._checkpoints["tissue"]
+            result = self.simulate(
+                medium=medium,
+                distance_meters=distance_meters,
+                initial_velocity=math.sqrt(2 * self.armour_result["remaining_energy"] / (self.bullet.mass / 1000.0)),
+                initial_position=self.air_result["final_position"],
+                initial_vertical_velocity=self.air_result["final_vertical_velocity"],
+                initial_vertical_position=self.air_result["final_vertical_position"],
+                initial_time=self.air_result["time_elapsed"],
+                checkpoints=checkpoints,
+                resume_from=self._resume_point(checkpoints, self.air_result["final_position"] + distance_meters)
+            )
+            self._cache["tissue"] = ((key, distance_meters), dict(result))
         self.tissue_result = result
-        return result
\ No newline at end of file
+        return result
+
+    def run_chain(self, air, air_distance, armour, tissue, tissue_distance):
+        """
+        Runs the air -> armour -> tissue chain for what-if studies.
+        Stages whose inputs are unchanged return their cached results, so only the
+        changed suffix of the chain is recomputed.
+        :return: Tuple of (air_result, armour_result, tissue_result).
+        """
+        air_result = self.air_simulation(air, air_distance)
+        armour_result = self.armour_simulation(armour)
+        tissue_result = self.tissue_simulation(tissue, tissue_distance)
+        return air_result, armour_result, tissue_result
+
+    @staticmethod
+    def _stage_key(*inputs):
+        """
+        Serializes everything a stage depends on into a comparable key.
+        """
+        return json.dumps(inputs, sort_keys=True, default=str)
+
+    @staticmethod
+    def _resume_point(checkpoints, target_position):
+        """
+        Returns the furthest checkpoint short of the target, or None to start from scratch.
+        """
+        positions = [position for position in checkpoints if position < target_position]
+        if not positions:
+            return None
+        return checkpoints[max(positions)]
+
+    def _upstream_key(self, stage):
+        """
+        Key of a finished stage for use by the next one. Falls back to the contents of the
+        stage result when it was set directly or edited after being returned.
+        """
+        result = getattr(self, f"{stage}_result")
+        cached = self._cache.get(stage)
+        if cached is not None and cached[1] == result:
+            return cached[0]
+        return self._stage_key(result)
+
+    def _begin_stage(self, stage, key, distance_meters):
+        """
+        Returns a copy of the cached result if the stage inputs are unchanged. Otherwise resets the
+        stage checkpoints if its key changed, invalidates all later stages and returns None.
+        """
+        cached = self._cache.get(stage)
+        if cached is not None and cached[0] == (key, distance_meters):
+            return dict(cached[1])
+
+        if self._stage_keys.get(stage) != key:
+            self._stage_keys[stage] = key
+            self._checkpoints[stage] = {}
+
+        for later in STAGES[STAGES.index(stage) + 1:]:
+            self._stage_keys.pop(later, None)
+            self._checkpoints.pop(later, None)
+            self._cache.pop(later, None)
+            setattr(self, f"{later}_result", None)
+        return None
\ No newline at end of file
@@ -0,0 +1,340 @@
+import hashlib
+import itertools
+import json
+import warnings
+from multiprocessing import Pool
+
+import numpy as np
+from numpy.polynomial import chebyshev
+
+from armour_class import Armour
+from bullet_class import Bullet
+from medium_class import Medium
+from simulation_class import Simulation
+from weapon_class import Weapon
+
+# Parameters that can be varied, and the object attribute each one overrides.
+PARAMETERS = {
+    "velocity": ("weapon", "muzzle_velocity"),  # m/s
+    "mass": ("bullet", "mass"),  # grams
+    "caliber": ("bullet", "caliber"),  # mm
+    "range": (None, "air_distance"),  # m
+    "air_density": ("air", "density"),
+    "air_drag_coefficient": ("air", "drag_coefficient"),
+    "armour_energy_absorption": ("armour", "energy_absorption"),
+    "tissue_density": ("tissue", "density"),
+    "tissue_drag_coefficient": ("tissue", "drag_coefficient"),
+    "tissue_depth": (None, "tissue_distance"),  # m
+}
+
+OUTPUTS = [
+    "air_final_velocity",
+    "air_time_elapsed",
+    "vertical_drop",
+    "armour_remaining_energy",
+    "tissue_final_velocity",
+    "tissue_final_kinetic_energy",
+]
+
+PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37]
+
+
+def spec_version(spec):
+    """
+    Returns a short content hash of the JSON file a spec object was loaded from.
+    :param spec: A Bullet, Weapon, Medium or Armour instance.
+    """
+    with open(spec.data_path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()[:16]
+
+
+def halton(count, dimensions, skip=0):
+    """
+    Generates points of the Halton low-discrepancy sequence in the unit cube.
+    :param count: Number of points.
+    :param dimensions: Number of dimensions (at most len(PRIMES)).
+    :param skip: Number of leading sequence points to skip.
+    :return: Array of shape (count, dimensions) with values in [0, 1).
+    """
+    if dimensions > len(PRIMES):
+        raise ValueError(f"Halton design supports at most {len(PRIMES)} dimensions.")
+
+    points = np.empty((count, dimensions))
+    indices = np.arange(skip + 1, skip + count + 1)
+    for column, base in enumerate(PRIMES[:dimensions]):
+        n = indices.copy()
+        fraction = 1.0
+        value = np.zeros(count)
+        while np.any(n > 0):
+            fraction /= base
+            value += fraction * (n % base)
+            n //= base
+        points[:, column] = value
+    return points
+
+
+def _run_chain(args):
+    """
+    Runs the air -> armour -> tissue chain for one parameter point.
+    Module level so that it can be dispatched to worker processes.
+    :return: Tuple of (output values, whether the armour was penetrated).
+    """
+    specs, defaults, point = args
+    weapon = Weapon(specs["weapon"])
+    bullet = Bullet(specs["bullet"])
+    objects = {
+        "weapon": weapon,
+        "bullet": bullet,
+        "air": Medium(specs["air"]),
+        "armour": Armour(specs["armour"]),
+        "tissue": Medium(specs["tissue"]),
+    }
+
+    values = dict(defaults)
+    values.update(point)
+    distances = {}
+    for name, value in values.items():
+        target, attribute = PARAMETERS[name]
+        if target is None:
+            distances[attribute] = value
+        else:
+            setattr(objects[target], attribute, value)
+
+    sim = Simulation(weapon, bullet)
+    air_result = sim.air_simulation(objects["air"], distances["air_distance"])
+    armour_result = sim.armour_simulation(objects["armour"])
+    tissue_result = sim.tissue_simulation(objects["tissue"], distances["tissue_distance"])
+
+    return [
+        air_result["final_velocity"],
+        air_result["time_elapsed"],
+        air_result["vertical_drop"],
+        armour_result["remaining_energy"],
+        tissue_result.get("final_velocity", 0.0),
+        tissue_result.get("final_kinetic_energy", 0.0),
+    ], armour_result["penetration"]
+
+
+class Surrogate:
+    """
+    Chebyshev polynomial approximation of the simulation chain over a box of parameters.
+    Build once with Surrogate.build(), then evaluate large arrays of points in one call.
+    The reported max_error is an empirical estimate from held-out points, not a certified bound.
+    """
+
+    def __init__(self, parameters, bounds, degree, multi_indices, coefficients, max_error, specs, defaults,
+                 error_estimate=None):
+        """
+        :param parameters: Ordered list of varied parameter names.
+        :param bounds: List of (low, high) pairs, one per parameter.
+        :param degree: Total polynomial degree of the fit.
+        :param multi_indices: Array (terms, dimensions) of Chebyshev degrees per term.
+        :param coefficients: Array (terms, outputs) of fitted coefficients.
+        :param max_error: Dict of output -> max absolute error on held-out points (empirical).
+        :param specs: Dict of spec role -> {"type", "version"} the model was trained on.
+        :param defaults: Values of the parameters held fixed during training.
+        :param error_estimate: Dict describing how max_error was obtained.
+        """
+        self.parameters = list(parameters)
+        self.bounds = np.asarray(bounds, dtype=float)
+        self.degree = degree
+        self.multi_indices = np.asarray(multi_indices, dtype=int)
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.max_error = max_error
+        self.specs = specs
+        self.defaults = defaults
+        self.error_estimate = error_estimate or {}
+
+    @classmethod
+    def build(cls, bounds, degree=4, samples=None, validation_samples=64, processes=None,
+              weapon_type="glock_17", bullet_type="9mm", air_type="unc_air",
+              armour_type="class_2", tissue_type="unc_tissue", range_meters=25, tissue_depth=0.4):
+        """
+        Samples the real Simulation on a Halton design and fits a Chebyshev surrogate.
+        Warns when the training points straddle the armour penetration cutoff: the tissue
+        outputs jump to 0 there and a single polynomial fits them poorly.
+        :param bounds: Dict of parameter name -> (low, high). Names are keys of PARAMETERS.
+        :param degree: Total degree of the Chebyshev polynomial.
+        :param samples: Number of training points (default: twice the number of terms).
+        :param validation_samples: Number of held-out points used to report the max error.
+        :param processes: Worker processes for sampling (None uses all cores).
+        :param range_meters: Air distance when "range" is not varied.
+        :param tissue_depth: Tissue distance when "tissue_depth" is not varied.
+        :return: Fitted Surrogate.
+        """
+        unknown = set(bounds) - set(PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown surrogate parameters: {sorted(unknown)}")
+        empty = [name for name, (low, high) in bounds.items() if not low < high]
+        if empty:
+            raise ValueError(f"Surrogate bounds need low < high: {empty}")
+
+        parameters = list(bounds)
+        limits = np.array([bounds[name] for name in parameters], dtype=float)
+        multi_indices = cls._multi_indices(len(parameters), degree)
+        if samples is None:
+            samples = 2 * len(multi_indices)
+        if samples < len(multi_indices):
+            raise ValueError(f"Need at least {len(multi_indices)} samples for degree {degree}.")
+
+        spec_types = {
+            "weapon": weapon_type,
+            "bullet": bullet_type,
+            "air": air_type,
+            "armour": armour_type,
+            "tissue": tissue_type,
+        }
+        specs = {
+            "weapon": Weapon(weapon_type),
+            "bullet": Bullet(bullet_type),
+            "air": Medium(air_type),
+            "armour": Armour(armour_type),
+            "tissue": Medium(tissue_type),
+        }
+        versions = {
+            role: {"type": spec_types[role], "version": spec_version(spec)}
+            for role, spec in specs.items()
+        }
+        defaults = {"range": range_meters, "tissue_depth": tissue_depth}
+        defaults = {name: value for name, value in defaults.items() if name not in bounds}
+
+        design = halton(samples + validation_samples, len(parameters))
+        points = limits[:, 0] + design * (limits[:, 1] - limits[:, 0])
+        jobs = [
+            (spec_types, defaults, dict(zip(parameters, row.tolist())))
+            for row in points
+        ]
+        with Pool(processes) as pool:
+            runs = pool.map(_run_chain, jobs)
+        values = np.array([outputs for outputs, _ in runs])
+        penetration = np.array([penetrated for _, penetrated in runs])
+
+        straddles = bool(penetration.any() and not penetration.all())
+        if straddles:
+            warnings.warn("Surrogate training points straddle the armour penetration cutoff; "
+                          "the armour and tissue outputs are discontinuous there and max_error "
+                          "will be large. Narrow the bounds to one side of the cutoff.")
+
+        error_estimate = {
+            "kind": "empirical",
+            "method": "max absolute error over held-out Halton points",
+            "validation_samples": validation_samples,
+            "straddles_penetration_cutoff": straddles,
+        }
+        surrogate = cls(parameters, limits, degree, multi_indices,
+                        np.zeros((len(multi_indices), len(OUTPUTS))), {}, versions, defaults, error_estimate)
+
+        basis = surrogate._basis(points[:samples])
+        coefficients, _, _, _ = np.linalg.lstsq(basis, values[:samples], rcond=None)
+        surrogate.coefficients = coefficients
+
+        if validation_samples > 0:
+            error = np.abs(surrogate._predict(points[samples:]) - values[samples:]).max(axis=0)
+            surrogate.max_error = dict(zip(OUTPUTS, error.tolist()))
+        return surrogate
+
+    @staticmethod
+    def _multi_indices(dimensions, degree):
+        """
+        Lists all Chebyshev degree combinations with total degree <= degree.
+        Each multiset of `degree` picks from the dimensions plus one slack slot is one
+        combination, so only the needed indices are generated.
+        """
+        indices = []
+        for picks in itertools.combinations_with_replacement(range(dimensions + 1), degree):
+            index = [0] * (dimensions + 1)
+            for pick in picks:
+                index[pick] += 1
+            indices.append(index[:dimensions])
+        return np.array(sorted(indices, key=lambda index: (sum(index), index)), dtype=int).reshape(-1, dimensions)
+
+    def _basis(self, points):
+        """
+        Evaluates every basis polynomial at the given points.
+        :param points: Array (n, dimensions) inside the bounds.
+        :return: Array (n, terms).
+        """
+        low, high = self.bounds[:, 0], self.bounds[:, 1]
+        scaled = 2.0 * (points - low) / (high - low) - 1.0
+
+        basis = np.ones((len(points), len(self.multi_indices)))
+        for column in range(len(self.parameters)):
+            vander = chebyshev.chebvander(scaled[:, column], self.degree)
+            basis *= vander[:, self.multi_indices[:, column]]
+        return basis
+
+    def _predict(self, points, chunk_size=65536):
+        """
+        Evaluates the fitted polynomials in chunks to bound temporary memory.
+        """
+        result = np.empty((len(points), self.coefficients.shape[1]))
+        for start in range(0, len(points), chunk_size):
+            stop = start + chunk_size
+            result[start:stop] = self._basis(points[start:stop]) @ self.coefficients
+        return result
+
+    def evaluate(self, points):
+        """
+        Evaluates the surrogate at many parameter points in one vectorized call.
+        :param points: Array (n, dimensions) in the order of self.parameters,
+                       or a dict of parameter name -> array of length n.
+        :return: Dict of output name -> array of length n.
+        """
+        if isinstance(points, dict):
+            points = np.column_stack([np.asarray(points[name], dtype=float) for name in self.parameters])
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+
+        if points.shape[1] != len(self.parameters):
+            raise ValueError(f"Expected {len(self.parameters)} columns: {self.parameters}")
+        if np.any(points < self.bounds[:, 0]) or np.any(points > self.bounds[:, 1]):
+            raise ValueError("Points outside the training bounds; the error estimate does not hold there.")
+
+        result = self._predict(points)
+        return {name: result[:, column] for column, name in enumerate(OUTPUTS)}
+
+    def stale_specs(self):
+        """
+        Lists spec roles whose data file changed since the surrogate was trained.
+        """
+        loaders = {"weapon": Weapon, "bullet": Bullet, "air": Medium, "armour": Armour, "tissue": Medium}
+        return [
+            role for role, spec in self.specs.items()
+            if spec_version(loaders[role](spec["type"])) != spec["version"]
+        ]
+
+    def to_dict(self):
+        """
+        Returns the surrogate as a JSON-serializable dictionary.
+        """
+        return {
+            "parameters": self.parameters,
+            "bounds": self.bounds.tolist(),
+            "degree": self.degree,
+            "multi_indices": self.multi_indices.tolist(),
+            "coefficients": self.coefficients.tolist(),
+            "outputs": OUTPUTS,
+            "max_error": self.max_error,
+            "error_estimate": self.error_estimate,
+            "specs": self.specs,
+            "defaults": self.defaults,
+        }
+
+    def save(self, path):
+        """
+        Writes the surrogate to a JSON file.
+        """
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a surrogate written by save().
+        """
+        with open(path, 'r') as file:
+            data = json.load(file)
+        if data["outputs"] != OUTPUTS:
+            raise ValueError("Surrogate file was written with a different output list.")
+        return cls(data["parameters"], data["bounds"], data["degree"], data["multi_indices"],
+                   data["coefficients"], data["max_error"], data["specs"], data["defaults"],
+                   data.get("error_estimate"))
@@ -0,0 +1,219 @@
+from multiprocessing import Pool
+
+import numpy as np
+
+from armour_class import Armour
+from batch_class import bullet_table
+
+VOID, MEDIUM, ARMOUR = 0, 1, 2
+
+
+_worker_volume = None
+
+
+def _init_worker(volume):
+    """
+    Receives the volume once per worker process instead of once per task.
+    """
+    global _worker_volume
+    _worker_volume = volume
+
+
+def _trace_chunk(args):
+    """
+    Traces one chunk of rays. Module level so that it can be dispatched to worker processes.
+    """
+    origins, directions, velocity, bullets = args
+    return _worker_volume._trace(origins, directions, velocity, bullets)
+
+
+class VoxelVolume:
+    """
+    3D target volume of voxels, each holding a material ID that maps to a Medium or Armour.
+    Rays are traced with a DDA grid walk and integrated exactly across each voxel.
+    """
+
+    def __init__(self, material_ids, materials, voxel_size, origin=(0, 0, 0)):
+        """
+        :param material_ids: Integer array (nx, ny, nz) of material IDs; may be a memmap.
+        :param materials: Dict of material ID -> Medium or Armour (non-negative IDs).
+                          IDs not listed, and negative IDs, are void.
+        :param voxel_size: Edge length of a voxel in meters.
+        :param origin: Position of the volume's lower corner in meters.
+        """
+        self.material_ids = material_ids
+        self.materials = materials
+        self.voxel_size = float(voxel_size)
+        self.origin = np.asarray(origin, dtype=float)
+        self.shape = np.array(material_ids.shape)
+        self.path = None
+
+        # Per-ID property lookup tables; the extra last slot is the void that unlisted IDs map to.
+        size = max(materials, default=0) + 2
+        self._kind = np.full(size, VOID, dtype=np.int8)
+        self._drag = np.zeros(size)  # density * drag coefficient
+        self._energy_absorption = np.zeros(size)
+        self._thickness = np.ones(size)
+        for material_id, material in materials.items():
+            if isinstance(material, Armour):
+                self._kind[material_id] = ARMOUR
+                self._energy_absorption[material_id] = material.energy_absorption
+                self._thickness[material_id] = material.thickness
+            else:
+                self._kind[material_id] = MEDIUM
+                self._drag[material_id] = material.density * material.drag_coefficient
+
+    @classmethod
+    def load(cls, path, materials, voxel_size, origin=(0, 0, 0)):
+        """
+        Memory-maps a volume of material IDs from a .npy file; voxels are read on demand.
+        """
+        volume = cls(np.load(path, mmap_mode='r'), materials, voxel_size, origin)
+        volume.path = path
+        return volume
+
+    def __getstate__(self):
+        # Memory-mapped volumes are reopened from disk in worker processes instead of being copied.
+        state = dict(self.__dict__)
+        if self.path is not None:
+            state["material_ids"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.path is not None:
+            self.material_ids = np.load(self.path, mmap_mode='r')
+
+    def trace(self, origins, directions, velocity, bullets, processes=None, chunk_size=65536):
+        """
+        Traces a batch of straight rays through the volume.
+        Gravity is neglected inside the volume. Outside it rays fly in a straight line without
+        drag, so time_elapsed and final_position are both measured from the ray origin.
+        Worker processes only pay off with several cores and large batches; each worker gets
+        the volume once, reopened from disk for memory-mapped volumes and copied otherwise.
+        :param origins: Array (n, 3) of ray start points in meters.
+        :param directions: Array (n, 3) of ray directions (normalized internally).
+        :param velocity: Entry velocity per ray (m/s), scalar or array.
+        :param bullets: Bullet, or structured array from bullet_table() (length 1 or n).
+        :param processes: Worker processes; None or 1 traces in this process.
+        :param chunk_size: Rays per worker task.
+        :return: Dictionary of per-ray arrays.
+        """
+        origins = np.atleast_2d(np.asarray(origins, dtype=float))
+        directions = np.atleast_2d(np.asarray(directions, dtype=float))
+        directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+        count = len(origins)
+        velocity = np.broadcast_to(np.asarray(velocity, dtype=float), (count,))
+        if not isinstance(bullets, np.ndarray):
+            bullets = bullet_table(bullets)
+        bullets = np.broadcast_to(bullets, (count,))
+
+        if not processes or processes == 1 or count <= chunk_size:
+            return self._trace(origins, directions, velocity, bullets)
+
+        jobs = [
+            (origins[start:start + chunk_size], directions[start:start + chunk_size],
+             velocity[start:start + chunk_size], bullets[start:start + chunk_size])
+            for start in range(0, count, chunk_size)
+        ]
+        with Pool(processes, initializer=_init_worker, initargs=(self,)) as pool:
+            parts = pool.map(_trace_chunk, jobs)
+        return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+    def _trace(self, origins, directions, velocity, bullets):
+        """
+        Vectorized Amanatides-Woo grid walk over all rays at once.
+        Drag is integrated exactly per voxel (v = v0 * exp(-k * s)); armour voxels remove
+        a constant energy per meter, the armour_simulation() resistance spread over its thickness.
+        """
+        count = len(origins)
+        mass = bullets["mass"] / 1000.0
+        area = bullets["cross_sectional_area"]
+        low = self.origin
+        high = self.origin + self.shape * self.voxel_size
+
+        # Entry and exit distances of every ray through the bounding box.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inverse = 1.0 / directions
+            t_low = (low - origins) * inverse
+            t_high = (high - origins) * inverse
+            t_enter = np.nanmax(np.minimum(t_low, t_high), axis=1)
+            t_exit = np.nanmin(np.maximum(t_low, t_high), axis=1)
+        t_enter = np.maximum(t_enter, 0)
+        hit = t_exit > t_enter
+
+        # Starting voxel, step direction and distances to the next voxel boundaries.
+        start = origins + directions * t_enter[:, None]
+        index = np.floor((start - low) / self.voxel_size).astype(np.int64)
+        index = np.clip(index, 0, self.shape - 1)
+        step = np.sign(directions).astype(np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            boundary = low + (index + (step > 0)) * self.voxel_size
+            t_max = np.where(directions != 0, (boundary - origins) * inverse, np.inf)
+            t_delta = np.where(directions != 0, self.voxel_size * np.abs(inverse), np.inf)
+
+        distance = t_enter.copy()
+        speed = velocity.astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            time = np.where(speed > 0, t_enter / speed, 0)  # Flight from the origin to the volume
+        stopped = np.zeros(count, dtype=bool)
+
+        active = np.flatnonzero(hit & (speed > 0))
+        while active.size:
+            ids = np.asarray(self.material_ids[index[active, 0], index[active, 1], index[active, 2]])
+            void = len(self._kind) - 1
+            ids = np.where((ids >= 0) & (ids < void), ids, void)  # Unlisted and negative IDs are void
+            kind = self._kind[ids]
+            axis = np.argmin(t_max[active], axis=1)
+            t_next = t_max[active, axis]
+            segment = np.maximum(t_next - distance[active], 0)
+
+            v0 = speed[active]
+            m = mass[active]
+            v1 = v0.copy()
+            elapsed = segment / v0
+            travelled = segment.copy()
+
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                # Medium: exact solution of dv/ds = -k v.
+                k = 0.5 * self._drag[ids] * area[active] / m
+                ks = k * segment
+                drag = (kind == MEDIUM) & (k > 0)
+                v1 = np.where(drag, v0 * np.exp(-ks), v1)
+                elapsed = np.where(drag, np.expm1(ks) / (k * v0), elapsed)
+
+                # Armour: dE/ds = -c, stopping inside the voxel once the energy is used up.
+                resistance = np.maximum(self._energy_absorption[ids] * np.maximum(area[active], 1e-4), 350)
+                c = resistance / self._thickness[ids]
+                energy = 0.5 * m * v0 ** 2
+                armour = kind == ARMOUR
+                halted = armour & (c * segment >= energy)
+                remaining = np.where(halted, 0, energy - c * segment)
+                v1 = np.where(armour, np.sqrt(np.maximum(2 * remaining / m, 0)), v1)
+                elapsed = np.where(armour, m * (v0 - v1) / c, elapsed)
+                travelled = np.where(halted, energy / c, travelled)
+
+            speed[active] = v1
+            time[active] += elapsed
+            distance[active] += travelled
+            stopped[active] |= halted
+
+            index[active, axis] += step[active, axis]
+            t_max[active, axis] += t_delta[active, axis]
+
+            inside = np.all((index[active] >= 0) & (index[active] < self.shape), axis=1)
+            active = active[inside & ~halted & (speed[active] > 0)]
+
+        final_position = origins + directions * distance[:, None]
+        initial_energy = 0.5 * mass * velocity ** 2
+        final_energy = 0.5 * mass * speed ** 2
+        return {
+            "hit": hit,
+            "stopped": stopped,
+            "final_velocity": speed,
+            "final_position": final_position,
+            "path_length": np.where(hit, distance - t_enter, 0),
+            "time_elapsed": time,
+            "final_kinetic_energy": final_energy,
+            "energy_loss": initial_energy - final_energy,
+        }